@@ -1,8 +1,12 @@
-from datetime import datetime
+import itertools
+import time
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import List, Optional
+from operator import itemgetter
+from typing import Dict, List, Literal, Optional, Tuple
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
 # Импорт модулей безопасности
@@ -15,7 +19,13 @@ from app.security.error_handling import (
 from app.security.secrets import secrets_manager
 from app.security.validation import FileValidationError, input_validator
 
-app = FastAPI(title="WishList API", version="0.1.0")
+app = FastAPI(
+    title="WishList API", version="0.1.0", default_response_class=ORJSONResponse
+)
+
+
+# Literal проверяется в pydantic-core сравнением со значениями, без regex
+Priority = Literal["low", "medium", "high"]
 
 
 class WishListItemBase(BaseModel):
@@ -28,9 +38,7 @@ class WishListItemBase(BaseModel):
     price: Optional[float] = Field(
         None, ge=0, description="Цена элемента (будет преобразована в Decimal)"
     )
-    priority: str = Field(
-        "medium", pattern="^(low|medium|high)$", description="Приоритет элемента"
-    )
+    priority: Priority = Field("medium", description="Приоритет элемента")
 
 
 class WishListItemCreate(WishListItemBase):
@@ -43,7 +51,7 @@ class WishListItemUpdate(BaseModel):
     price: Optional[float] = Field(
         None, ge=0, description="Цена элемента (будет преобразована в Decimal)"
     )
-    priority: Optional[str] = Field(None, pattern="^(low|medium|high)$")
+    priority: Optional[Priority] = None
     is_purchased: Optional[bool] = None
 
 
@@ -57,6 +65,8 @@ class WishListItem(WishListItemBase):
 
 
 class ApiError(Exception):
+    __slots__ = ("code", "message", "status")
+
     def __init__(self, code: str, message: str, status: int = 400):
         self.code = code
         self.message = message
@@ -154,52 +164,107 @@ def health_secrets():
         }
 
 
-# In-memory database for WishList
-_DB = {"wishlist_items": []}
+# In-memory database for WishList: индекс по id для O(1) доступа
+_DB_BY_ID: Dict[int, dict] = {}
+# itertools.count реализован на C и атомарен под GIL
+_NEXT_ID = itertools.count(1)
+
+# Вторичный индекс для фильтров: (priority, is_purchased) -> {id: item}.
+# Комбинаций всего шесть, поэтому фильтрация сводится к выбору корзин.
+_IDX: Dict[Tuple[str, bool], Dict[int, dict]] = {}
+
+
+# (миллисекунда, datetime); кортеж заменяется целиком, как в utc_timestamp
+_now_cache = (-1, datetime.min)
+
+
+def _utc_now() -> datetime:
+    """Текущее время UTC без tzinfo, пересчитывается не чаще раза в миллисекунду"""
+    global _now_cache
+
+    now_ms = time.time_ns() // 1_000_000
+    cached_ms, cached = _now_cache
+    if now_ms != cached_ms:
+        cached = datetime.fromtimestamp(now_ms / 1000, timezone.utc).replace(
+            tzinfo=None
+        )
+        _now_cache = (now_ms, cached)
+    return cached
+
+
+def _index_key(item: dict) -> Tuple[str, bool]:
+    return item["priority"], item["is_purchased"]
+
+
+def _index_add(item: dict) -> None:
+    _IDX.setdefault(_index_key(item), {})[item["id"]] = item
+
+
+def _index_remove(item: dict) -> None:
+    bucket = _IDX.get(_index_key(item))
+    if bucket is not None:
+        bucket.pop(item["id"], None)
+
+
+def validate_create_item(item: WishListItemCreate) -> dict:
+    """
+    Проверка полей нового элемента без HTTP-слоя
+
+    Returns:
+        Проверенные name, description и price для записи в хранилище
+
+    Raises:
+        FileValidationError: Если поле содержит опасные данные или неверную цену
+    """
+    # Валидация входных данных
+    validated_name = input_validator.validate_string_input(
+        item.name, "name", max_length=200
+    )
+    validated_description = None
+    if item.description:
+        validated_description = input_validator.validate_string_input(
+            item.description, "description", max_length=1000
+        )
+
+    # Валидация и нормализация цены в Decimal
+    validated_price = None
+    if item.price is not None:
+        validated_price = input_validator.validate_decimal(
+            item.price,
+            "price",
+            min_value=Decimal("0"),
+            max_digits=12,
+            decimal_places=2,
+        )
+
+    return {
+        "name": validated_name,
+        "description": validated_description,
+        "price": float(validated_price) if validated_price else None,
+    }
 
 
 @app.post("/wishlist/items", response_model=WishListItem)
-def create_wishlist_item(item: WishListItemCreate):
+async def create_wishlist_item(item: WishListItemCreate):
     """Создать новый элемент в списке желаний"""
     try:
-        # Валидация входных данных
-        validated_name = input_validator.validate_string_input(
-            item.name, "name", max_length=200
-        )
-        validated_description = None
-        if item.description:
-            validated_description = input_validator.validate_string_input(
-                item.description, "description", max_length=1000
-            )
-
-        # Валидация и нормализация цены в Decimal
-        validated_price = None
-        if item.price is not None:
-            validated_price = input_validator.validate_decimal(
-                item.price,
-                "price",
-                min_value=Decimal("0"),
-                max_digits=12,
-                decimal_places=2,
-            )
+        validated = validate_create_item(item)
 
-        new_id = len(_DB["wishlist_items"]) + 1
-        # Нормализация datetime в UTC
-        now = input_validator.normalize_datetime_utc(datetime.now())
+        new_id = next(_NEXT_ID)
+        now = _utc_now()
 
         wishlist_item = {
             "id": new_id,
-            "name": validated_name,
-            "description": validated_description,
-            "price": float(validated_price) if validated_price else None,
+            **validated,
             "priority": item.priority,
             "is_purchased": False,
             "created_at": now,
             "updated_at": now,
         }
 
-        _DB["wishlist_items"].append(wishlist_item)
-        return wishlist_item
+        _DB_BY_ID[new_id] = wishlist_item
+        _index_add(wishlist_item)
+        return ORJSONResponse(content=wishlist_item)
 
     except FileValidationError as e:
         raise e
@@ -210,68 +275,83 @@ def create_wishlist_item(item: WishListItemCreate):
 
 
 @app.get("/wishlist/items", response_model=List[WishListItem])
-def get_wishlist_items(
+async def get_wishlist_items(
     priority: Optional[str] = None, is_purchased: Optional[bool] = None
 ):
     """Получить все элементы списка желаний с возможностью фильтрации"""
-    items = _DB["wishlist_items"].copy()
+    if priority is None and is_purchased is None:
+        return ORJSONResponse(content=list(_DB_BY_ID.values()))
 
-    if priority is not None:
-        items = [item for item in items if item["priority"] == priority]
-
-    if is_purchased is not None:
-        items = [item for item in items if item["is_purchased"] == is_purchased]
+    # Читаем только подходящие корзины индекса; .get() не создаёт пустые
+    # корзины для произвольных значений из query string
+    if priority is not None and is_purchased is not None:
+        buckets = [_IDX.get((priority, is_purchased), {})]
+    else:
+        buckets = [
+            bucket
+            for (item_priority, item_is_purchased), bucket in _IDX.items()
+            if priority is None or item_priority == priority
+            if is_purchased is None or item_is_purchased == is_purchased
+        ]
+
+    # Порядок по id совпадает с порядком полного списка
+    items = sorted(
+        (item for bucket in buckets for item in bucket.values()),
+        key=itemgetter("id"),
+    )
 
-    return items
+    return ORJSONResponse(content=items)
 
 
 @app.get("/wishlist/items/{item_id}", response_model=WishListItem)
-def get_wishlist_item(item_id: int):
+async def get_wishlist_item(item_id: int):
     """Получить конкретный элемент списка желаний по ID"""
-    for item in _DB["wishlist_items"]:
-        if item["id"] == item_id:
-            return item
+    item = _DB_BY_ID.get(item_id)
+    if item is not None:
+        return ORJSONResponse(content=item)
 
     raise ApiError(code="not_found", message="wishlist item not found", status=404)
 
 
 @app.put("/wishlist/items/{item_id}", response_model=WishListItem)
-def update_wishlist_item(item_id: int, item_update: WishListItemUpdate):
+async def update_wishlist_item(item_id: int, item_update: WishListItemUpdate):
     """Обновить элемент списка желаний"""
-    for i, item in enumerate(_DB["wishlist_items"]):
-        if item["id"] == item_id:
-            update_data = item_update.model_dump(exclude_unset=True)
-
-            # Валидация и нормализация цены в Decimal, если она обновляется
-            if "price" in update_data and update_data["price"] is not None:
-                update_data["price"] = float(
-                    input_validator.validate_decimal(
-                        update_data["price"],
-                        "price",
-                        min_value=Decimal("0"),
-                        max_digits=12,
-                        decimal_places=2,
-                    )
-                )
-
-            for field, value in update_data.items():
-                item[field] = value
-
-            # Нормализация datetime в UTC
-            item["updated_at"] = input_validator.normalize_datetime_utc(datetime.now())
-            _DB["wishlist_items"][i] = item
-            return item
+    item = _DB_BY_ID.get(item_id)
+    if item is None:
+        raise ApiError(code="not_found", message="wishlist item not found", status=404)
+
+    # model_fields_set содержит только явно переданные поля, без сборки dict
+    fields_set = item_update.model_fields_set
+
+    # Валидация и нормализация цены в Decimal, если она обновляется
+    price = item_update.price
+    if "price" in fields_set and price is not None:
+        price = float(
+            input_validator.validate_decimal(
+                price,
+                "price",
+                min_value=Decimal("0"),
+                max_digits=12,
+                decimal_places=2,
+            )
+        )
 
-    raise ApiError(code="not_found", message="wishlist item not found", status=404)
+    _index_remove(item)
+    for field in fields_set:
+        item[field] = price if field == "price" else getattr(item_update, field)
+    _index_add(item)
+
+    item["updated_at"] = _utc_now()
+    return ORJSONResponse(content=item)
 
 
 @app.delete("/wishlist/items/{item_id}")
-def delete_wishlist_item(item_id: int):
+async def delete_wishlist_item(item_id: int):
     """Удалить элемент из списка желаний"""
-    for i, item in enumerate(_DB["wishlist_items"]):
-        if item["id"] == item_id:
-            deleted_item = _DB["wishlist_items"].pop(i)
-            return {"message": f"Item '{deleted_item['name']}' deleted successfully"}
+    deleted_item = _DB_BY_ID.pop(item_id, None)
+    if deleted_item is not None:
+        _index_remove(deleted_item)
+        return {"message": f"Item '{deleted_item['name']}' deleted successfully"}
 
     raise ApiError(code="not_found", message="wishlist item not found", status=404)
 
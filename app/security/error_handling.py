@@ -4,43 +4,158 @@
 Реализует ADR-002
 """
 
+import os
 import re
-import uuid
-from datetime import datetime
+import time
+from functools import lru_cache
 from typing import Any, Dict, Optional
 
+import orjson
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
+
+# Все паттерны PII объединены в одну альтернацию, чтобы текст сканировался
+# за один проход. Путь поглощает email, если тот идёт сразу за ним
+# ("/home/user@example.com", "/home/john+doe@example.com"), а email - следующие
+# за ним адреса из той же серии символов ("a@b.cd%a@b.cd"): иначе lookbehind
+# не дал бы начать совпадение внутри серии и часть адреса осталась бы открытой.
+#
+# Время сопоставления линейно по длине текста:
+# - email начинается только в начале серии допустимых символов (lookbehind
+#   вместо \b), поэтому длинная серия вида "a.a.a..." не сканируется заново
+#   с каждой границы слова;
+# - possessive-квантификаторы (++, *+) не возвращают символы там, где возврат
+#   не может привести к совпадению: локальная часть не содержит "@",
+#   метка домена не содержит ".".
+#
+# Метки домена могут быть пустыми ("user@example..com"): маскирование
+# срабатывает и на некорректных адресах.
+_DOMAIN = r"(?:[A-Za-z0-9-]*+\.)+[A-Za-z]{2,}\b"
+_EMAIL_TAIL = rf"[A-Za-z0-9._%+-]*+@{_DOMAIN}"
+_PII_RE = re.compile(
+    rf"(?P<email>(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]++@{_DOMAIN}"
+    rf"(?:{_EMAIL_TAIL})*)"
+    r"|(?P<token>\b[A-Za-z0-9]{10,}+(?=\b))"
+    rf"|(?P<path>/[A-Za-z0-9/._-]+(?:{_EMAIL_TAIL})*)"
+    r"|(?P<ip>\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b)"
+)
+
+_PII_REPLACEMENTS = {
+    "email": "***@***.***",
+    "path": "/***PATH***",
+    "ip": "***.***.***.***",
+}
+
+# Любой паттерн PII требует "@", "/" или цифру: строки без них не меняются
+_PII_HINT_RE = re.compile(r"[@/0-9]")
+
+# Ключи, значения которых формирует сам сервис (идентификаторы, перечисления,
+# метки времени); mask_sensitive_data не прогоняет их через регулярные выражения
+NON_PII_KEYS = frozenset(
+    {
+        "id",
+        "status",
+        "priority",
+        "is_purchased",
+        "created_at",
+        "updated_at",
+        "timestamp",
+        "correlation_id",
+    }
+)
+
+# Таблица удаления цифр: токен содержит цифру, если translate меняет строку
+_STRIP_DIGITS = str.maketrans("", "", "0123456789")
+
+
+def _mask_match(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "token":
+        token = match.group()
+        if len(token.translate(_STRIP_DIGITS)) != len(token):
+            return "***TOKEN***"
+        return token
+    return _PII_REPLACEMENTS[kind]
+
+
+def new_correlation_id() -> str:
+    """Генерация correlation_id: 128 бит случайности в hex без объекта UUID"""
+    return os.urandom(16).hex()
+
+
+# (миллисекунда, отформатированная метка); кортеж заменяется целиком,
+# поэтому конкурентные читатели не увидят рассогласованную пару
+_timestamp_cache = (-1, "")
+
+
+def utc_timestamp() -> str:
+    """Текущее время UTC в ISO 8601 с точностью до миллисекунд"""
+    global _timestamp_cache
+
+    now_ms = time.time_ns() // 1_000_000
+    cached_ms, cached = _timestamp_cache
+    if now_ms == cached_ms:
+        return cached
+
+    seconds, millis = divmod(now_ms, 1000)
+    formatted = (
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{millis:03d}Z"
+    )
+    _timestamp_cache = (now_ms, formatted)
+    return formatted
+
+
+# Длинные строки не кэшируются: уникальный мусор не должен вытеснять
+# повторяющиеся сообщения об ошибках
+_MASK_CACHE_MAX_LEN = 2048
+
+
+@lru_cache(maxsize=4096)
+def _mask_pii_cached(text: str) -> str:
+    return _PII_RE.sub(_mask_match, text)
+
+
+def mask_pii(text: str) -> str:
+    """Маскирование PII данных в тексте"""
+    if not text or not _PII_HINT_RE.search(text):
+        return text
+
+    if len(text) > _MASK_CACHE_MAX_LEN:
+        return _PII_RE.sub(_mask_match, text)
+    return _mask_pii_cached(text)
 
 
 class RFC7807Error:
     """Класс для создания ошибок в формате RFC 7807"""
 
+    __slots__ = ("error_type", "status", "detail", "instance", "correlation_id")
+
+    # error_type -> (type URI, title)
     ERROR_TYPES = {
-        "validation-error": {
-            "type": "https://api.wishlist.com/errors/validation-error",
-            "title": "Validation Error",
-        },
-        "not-found": {
-            "type": "https://api.wishlist.com/errors/not-found",
-            "title": "Not Found",
-        },
-        "authentication-error": {
-            "type": "https://api.wishlist.com/errors/authentication-error",
-            "title": "Authentication Error",
-        },
-        "authorization-error": {
-            "type": "https://api.wishlist.com/errors/authorization-error",
-            "title": "Authorization Error",
-        },
-        "rate-limit-error": {
-            "type": "https://api.wishlist.com/errors/rate-limit-error",
-            "title": "Rate Limit Exceeded",
-        },
-        "internal-error": {
-            "type": "https://api.wishlist.com/errors/internal-error",
-            "title": "Internal Server Error",
-        },
+        "validation-error": (
+            "https://api.wishlist.com/errors/validation-error",
+            "Validation Error",
+        ),
+        "not-found": (
+            "https://api.wishlist.com/errors/not-found",
+            "Not Found",
+        ),
+        "authentication-error": (
+            "https://api.wishlist.com/errors/authentication-error",
+            "Authentication Error",
+        ),
+        "authorization-error": (
+            "https://api.wishlist.com/errors/authorization-error",
+            "Authorization Error",
+        ),
+        "rate-limit-error": (
+            "https://api.wishlist.com/errors/rate-limit-error",
+            "Rate Limit Exceeded",
+        ),
+        "internal-error": (
+            "https://api.wishlist.com/errors/internal-error",
+            "Internal Server Error",
+        ),
     }
 
     def __init__(
@@ -55,50 +170,55 @@ class RFC7807Error:
         self.status = status
         self.detail = detail
         self.instance = instance
-        self.correlation_id = correlation_id or str(uuid.uuid4())
+        self.correlation_id = correlation_id or new_correlation_id()
 
     def to_dict(self) -> Dict[str, Any]:
         """Преобразование в словарь для JSON ответа"""
-        error_info = self.ERROR_TYPES.get(
-            self.error_type,
-            {
+        template = _DICT_TEMPLATES.get(self.error_type)
+        if template is None:
+            template = {
                 "type": f"https://api.wishlist.com/errors/{self.error_type}",
                 "title": "Unknown Error",
-            },
-        )
+            }
 
         return {
-            "type": error_info["type"],
-            "title": error_info["title"],
+            **template,
             "status": self.status,
-            "detail": self._mask_pii(self.detail),
+            "detail": mask_pii(self.detail),
             "instance": self.instance or "/",
             "correlation_id": self.correlation_id,
-            "timestamp": datetime.now().isoformat() + "Z",
+            "timestamp": utc_timestamp(),
         }
 
-    def _mask_pii(self, text: str) -> str:
-        """Маскирование PII данных в тексте"""
-        if not text:
-            return text
 
-        text = re.sub(
-            r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b", "***@***.***", text
-        )
+# Неизменные поля тела ошибки для каждого типа, собранные один раз
+_DICT_TEMPLATES = {
+    error_type: {"type": type_uri, "title": title}
+    for error_type, (type_uri, title) in RFC7807Error.ERROR_TYPES.items()
+}
 
-        text = re.sub(
-            r"\b[A-Za-z0-9]{10,}(?=\b)",
-            lambda m: (
-                "***TOKEN***" if any(c.isdigit() for c in m.group()) else m.group()
-            ),
-            text,
-        )
 
-        text = re.sub(r"/[A-Za-z0-9/._-]+", "/***PATH***", text)
+# Для самых частых ошибок неизменная часть JSON-конверта собрана заранее;
+# в ответ подставляются только переменные поля, экранированные orjson
+_ENVELOPE_PREFIXES = {
+    error_type: b'{"type":%b,"title":%b,"status":'
+    % (orjson.dumps(type_uri), orjson.dumps(title))
+    for error_type, (type_uri, title) in RFC7807Error.ERROR_TYPES.items()
+    if error_type in ("not-found", "validation-error")
+}
 
-        text = re.sub(r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b", "***.***.***.***", text)
+_ENVELOPE_SUFFIX = b'%d,"detail":%b,"instance":%b,"correlation_id":%b,"timestamp":"%b"}'
 
-        return text
+
+def _render_envelope(prefix: bytes, error: RFC7807Error) -> bytes:
+    """Сборка тела ошибки по заготовке без промежуточного словаря"""
+    return prefix + _ENVELOPE_SUFFIX % (
+        error.status,
+        orjson.dumps(mask_pii(error.detail)),
+        orjson.dumps(error.instance or "/"),
+        orjson.dumps(error.correlation_id),
+        utc_timestamp().encode(),
+    )
 
 
 class ErrorHandler:
@@ -107,15 +227,21 @@ class ErrorHandler:
     def __init__(self):
         self.correlation_id_header = "X-Correlation-ID"
 
-    def create_error_response(
-        self, error: RFC7807Error, request: Request
-    ) -> JSONResponse:
+    def create_error_response(self, error: RFC7807Error, request: Request) -> Response:
         """Создание JSON ответа с ошибкой"""
-        error_dict = error.to_dict()
-
         headers = {self.correlation_id_header: error.correlation_id}
 
-        return JSONResponse(
+        prefix = _ENVELOPE_PREFIXES.get(error.error_type)
+        if prefix is not None:
+            return Response(
+                content=_render_envelope(prefix, error),
+                status_code=error.status,
+                headers=headers,
+                media_type="application/json",
+            )
+
+        error_dict = error.to_dict()
+        return ORJSONResponse(
             status_code=error.status, content=error_dict, headers=headers
         )
 
@@ -124,43 +250,44 @@ class ErrorHandler:
         correlation_id = request.headers.get(self.correlation_id_header)
 
         if not correlation_id:
-            correlation_id = str(uuid.uuid4())
+            correlation_id = new_correlation_id()
 
         return correlation_id
 
     def mask_sensitive_data(self, data: Any) -> Any:
-        """Рекурсивное маскирование чувствительных данных"""
+        """Маскирование чувствительных данных во вложенных dict/list
+
+        Обход выполняется по явному стеку, поэтому глубина вложенности не
+        ограничена лимитом рекурсии. Исходная структура не изменяется.
+        """
         if isinstance(data, str):
-            return self._mask_pii(data)
-        elif isinstance(data, dict):
-            return {k: self.mask_sensitive_data(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self.mask_sensitive_data(item) for item in data]
-        else:
+            return mask_pii(data)
+        if not isinstance(data, (dict, list)):
             return data
 
-    def _mask_pii(self, text: str) -> str:
-        """Маскирование PII данных в тексте"""
-        if not text:
-            return text
-
-        text = re.sub(
-            r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b", "***@***.***", text
-        )
-
-        text = re.sub(
-            r"\b[A-Za-z0-9]{10,}(?=\b)",
-            lambda m: (
-                "***TOKEN***" if any(c.isdigit() for c in m.group()) else m.group()
-            ),
-            text,
-        )
-
-        text = re.sub(r"/[A-Za-z0-9/._-]+", "/***PATH***", text)
-
-        text = re.sub(r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b", "***.***.***.***", text)
-
-        return text
+        root: Any = {} if isinstance(data, dict) else []
+        stack = [(data, root)]
+        while stack:
+            source, target = stack.pop()
+            is_dict = isinstance(source, dict)
+            for key, value in source.items() if is_dict else enumerate(source):
+                if isinstance(value, str):
+                    if is_dict and key in NON_PII_KEYS:
+                        masked = value
+                    else:
+                        masked = mask_pii(value)
+                elif isinstance(value, (dict, list)):
+                    masked = {} if isinstance(value, dict) else []
+                    stack.append((value, masked))
+                else:
+                    masked = value
+
+                if is_dict:
+                    target[key] = masked
+                else:
+                    target.append(masked)
+
+        return root
 
 
 error_handler = ErrorHandler()
@@ -4,11 +4,16 @@
 Реализует безопасные HTTP-запросы с таймаутами, ретраями и лимитами.
 """
 
+import asyncio
+import atexit
+import logging
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import httpx
 
+logger = logging.getLogger(__name__)
+
 
 class SecureHTTPClient:
     """Безопасный HTTP-клиент с таймаутами и ретраями"""
@@ -17,6 +22,15 @@ class SecureHTTPClient:
     DEFAULT_MAX_RETRIES = 3
     DEFAULT_RETRY_DELAY = 0.5
     DEFAULT_MAX_REDIRECTS = 5
+    DEFAULT_LIMITS = httpx.Limits(
+        max_keepalive_connections=50, max_connections=200, keepalive_expiry=30.0
+    )
+
+    # Статусы, которыми сервер сообщает, что HEAD не поддерживается
+    HEAD_UNSUPPORTED_STATUSES = (405, 501)
+
+    # Временные отказы сервера; 501, 505 и прочие 5xx от повтора не изменятся
+    RETRYABLE_STATUSES = frozenset({500, 502, 503, 504})
 
     def __init__(
         self,
@@ -24,6 +38,8 @@ class SecureHTTPClient:
         max_retries: int = DEFAULT_MAX_RETRIES,
         retry_delay: float = DEFAULT_RETRY_DELAY,
         max_redirects: int = DEFAULT_MAX_REDIRECTS,
+        limits: Optional[httpx.Limits] = None,
+        transport: Optional[httpx.BaseTransport] = None,
     ):
         """
         Инициализация безопасного HTTP-клиента
@@ -33,11 +49,59 @@ class SecureHTTPClient:
             max_retries: Максимальное количество попыток
             retry_delay: Задержка между попытками (базовая)
             max_redirects: Максимальное количество редиректов
+            limits: Лимиты пула соединений
+            transport: Транспорт httpx (по умолчанию - сетевой)
         """
         self.timeout = timeout or self.DEFAULT_TIMEOUT
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.max_redirects = max_redirects
+        # Один клиент на экземпляр: пул соединений и TLS-сессии переиспользуются
+        # между запросами и попытками, HTTP/2 мультиплексирует их в одном сокете
+        self._client = httpx.Client(
+            http2=True,
+            limits=limits or self.DEFAULT_LIMITS,
+            timeout=self.timeout,
+            follow_redirects=True,
+            max_redirects=self.max_redirects,
+            transport=transport,
+        )
+
+    def __enter__(self) -> "SecureHTTPClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Закрытие пула соединений"""
+        self._client.close()
+
+    def _request_with_retries(
+        self, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        # Повторяются только сбои транспорта (включая таймауты), кроме
+        # неподдерживаемой схемы URL, и временные отказы 500/502/503/504;
+        # остальные ошибки возвращаются сразу
+        for attempt in range(self.max_retries):
+            is_last_attempt = attempt == self.max_retries - 1
+            try:
+                response = self._client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if is_last_attempt or isinstance(e, httpx.UnsupportedProtocol):
+                    raise
+            else:
+                if (
+                    response.status_code not in self.RETRYABLE_STATUSES
+                    or is_last_attempt
+                ):
+                    response.raise_for_status()
+                    return response
+
+            # Экспоненциальная задержка
+            time.sleep(self.retry_delay * (2**attempt))
+
+        raise httpx.HTTPError("Все попытки запроса исчерпаны")
 
     def get(
         self,
@@ -59,32 +123,27 @@ class SecureHTTPClient:
         Raises:
             httpx.HTTPError: При ошибке после всех попыток
         """
-        last_exception = None
+        return self._request_with_retries("GET", url, headers=headers, params=params)
 
-        for attempt in range(self.max_retries):
-            try:
-                with httpx.Client(
-                    timeout=self.timeout,
-                    follow_redirects=True,
-                    max_redirects=self.max_redirects,
-                ) as client:
-                    response = client.get(url, headers=headers, params=params)
-                    response.raise_for_status()
-                    return response
+    def head(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """
+        Безопасный HEAD запрос с ретраями
 
-            except (httpx.HTTPError, httpx.TimeoutException) as e:
-                last_exception = e
-                if attempt < self.max_retries - 1:
-                    # Экспоненциальная задержка
-                    delay = self.retry_delay * (2**attempt)
-                    time.sleep(delay)
-                else:
-                    raise
+        Args:
+            url: URL для запроса
+            headers: Заголовки запроса
 
-        # Если все попытки исчерпаны
-        if last_exception:
-            raise last_exception
-        raise httpx.HTTPError("Все попытки запроса исчерпаны")
+        Returns:
+            Response объект
+
+        Raises:
+            httpx.HTTPError: При ошибке после всех попыток
+        """
+        return self._request_with_retries("HEAD", url, headers=headers)
 
     def post(
         self,
@@ -108,49 +167,306 @@ class SecureHTTPClient:
         Raises:
             httpx.HTTPError: При ошибке после всех попыток
         """
-        last_exception = None
+        return self._request_with_retries(
+            "POST", url, json=json, data=data, headers=headers
+        )
+
+    def health_check(self, url: str) -> bool:
+        """
+        Проверка доступности сервиса
+
+        Сначала выполняется HEAD, чтобы не передавать тело ответа;
+        если сервер не поддерживает HEAD, выполняется GET.
+
+        Args:
+            url: URL для проверки
+
+        Returns:
+            True если сервис доступен, False иначе
+        """
+        try:
+            try:
+                response = self.head(url)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in self.HEAD_UNSUPPORTED_STATUSES:
+                    return False
+                response = self.get(url)
+            return response.status_code == 200
+        except Exception:
+            return False
+
+
+class SecureAsyncHTTPClient:
+    """Асинхронный безопасный HTTP-клиент с таймаутами и ретраями
+
+    Не блокирует event loop: ожидание ответа и пауза между попытками
+    выполняются через await, поэтому один воркер обслуживает много
+    исходящих запросов одновременно.
+    """
+
+    DEFAULT_TIMEOUT = SecureHTTPClient.DEFAULT_TIMEOUT
+    DEFAULT_MAX_RETRIES = SecureHTTPClient.DEFAULT_MAX_RETRIES
+    DEFAULT_RETRY_DELAY = SecureHTTPClient.DEFAULT_RETRY_DELAY
+    DEFAULT_MAX_REDIRECTS = SecureHTTPClient.DEFAULT_MAX_REDIRECTS
+    DEFAULT_LIMITS = SecureHTTPClient.DEFAULT_LIMITS
+    HEAD_UNSUPPORTED_STATUSES = SecureHTTPClient.HEAD_UNSUPPORTED_STATUSES
+    RETRYABLE_STATUSES = SecureHTTPClient.RETRYABLE_STATUSES
+
+    def __init__(
+        self,
+        timeout: Optional[httpx.Timeout] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        max_redirects: int = DEFAULT_MAX_REDIRECTS,
+        limits: Optional[httpx.Limits] = None,
+        max_concurrency: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Инициализация асинхронного HTTP-клиента
+
+        Args:
+            timeout: Таймауты для запросов
+            max_retries: Максимальное количество попыток
+            retry_delay: Задержка между попытками (базовая)
+            max_redirects: Максимальное количество редиректов
+            limits: Лимиты пула соединений
+            max_concurrency: Ограничение одновременных запросов (None - без ограничения)
+            transport: Транспорт httpx (по умолчанию - сетевой)
+        """
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_redirects = max_redirects
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=self.timeout,
+            follow_redirects=True,
+            max_redirects=self.max_redirects,
+            limits=limits or self.DEFAULT_LIMITS,
+            transport=transport,
+        )
+        self._semaphore = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        )
+
+    async def __aenter__(self) -> "SecureAsyncHTTPClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Закрытие пула соединений"""
+        await self._client.aclose()
 
+    async def _send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        if self._semaphore is None:
+            return await self._client.request(method, url, **kwargs)
+        async with self._semaphore:
+            return await self._client.request(method, url, **kwargs)
+
+    async def _request_with_retries(
+        self, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        # Та же политика повторов, что и в SecureHTTPClient
         for attempt in range(self.max_retries):
+            is_last_attempt = attempt == self.max_retries - 1
             try:
-                with httpx.Client(
-                    timeout=self.timeout,
-                    follow_redirects=True,
-                    max_redirects=self.max_redirects,
-                ) as client:
-                    response = client.post(url, json=json, data=data, headers=headers)
+                response = await self._send(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if is_last_attempt or isinstance(e, httpx.UnsupportedProtocol):
+                    raise
+            else:
+                if (
+                    response.status_code not in self.RETRYABLE_STATUSES
+                    or is_last_attempt
+                ):
                     response.raise_for_status()
                     return response
 
-            except (httpx.HTTPError, httpx.TimeoutException) as e:
-                last_exception = e
-                if attempt < self.max_retries - 1:
-                    # Экспоненциальная задержка
-                    delay = self.retry_delay * (2**attempt)
-                    time.sleep(delay)
-                else:
-                    raise
+            # Экспоненциальная задержка
+            await asyncio.sleep(self.retry_delay * (2**attempt))
 
-        # Если все попытки исчерпаны
-        if last_exception:
-            raise last_exception
         raise httpx.HTTPError("Все попытки запроса исчерпаны")
 
-    def health_check(self, url: str) -> bool:
+    async def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
         """
-        Проверка доступности сервиса
+        Безопасный асинхронный GET запрос с ретраями
 
-        Args:
-            url: URL для проверки
+        Raises:
+            httpx.HTTPError: При ошибке после всех попыток
+        """
+        return await self._request_with_retries(
+            "GET", url, headers=headers, params=params
+        )
 
-        Returns:
-            True если сервис доступен, False иначе
+    async def head(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """
+        Безопасный асинхронный HEAD запрос с ретраями
+
+        Raises:
+            httpx.HTTPError: При ошибке после всех попыток
+        """
+        return await self._request_with_retries("HEAD", url, headers=headers)
+
+    async def post(
+        self,
+        url: str,
+        json: Optional[Any] = None,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
         """
+        Безопасный асинхронный POST запрос с ретраями
+
+        Raises:
+            httpx.HTTPError: При ошибке после всех попыток
+        """
+        return await self._request_with_retries(
+            "POST", url, json=json, data=data, headers=headers
+        )
+
+    def buffered(
+        self,
+        url: str,
+        flush_threshold: int = 100,
+        flush_interval_ms: int = 50,
+    ) -> "BufferedSecureHTTPClient":
+        """Буфер, отправляющий накопленные payload'ы на url одним POST"""
+        return BufferedSecureHTTPClient(
+            self,
+            url,
+            flush_threshold=flush_threshold,
+            flush_interval_ms=flush_interval_ms,
+        )
+
+    async def health_check(self, url: str) -> bool:
+        """Проверка доступности сервиса (HEAD с откатом на GET)"""
         try:
-            response = self.get(url)
+            try:
+                response = await self.head(url)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in self.HEAD_UNSUPPORTED_STATUSES:
+                    return False
+                response = await self.get(url)
             return response.status_code == 200
         except Exception:
             return False
 
 
+class BufferedSecureHTTPClient:
+    """Микробатчинг исходящих запросов к bulk-эндпойнту
+
+    Payload'ы копятся в буфере и отправляются JSON-массивом одним POST,
+    когда набирается flush_threshold элементов или проходит
+    flush_interval_ms. При выходе из контекста буфер отправляется целиком.
+
+    Батч, который не удалось отправить, возвращается в начало буфера и
+    уходит при следующем сбросе. Ошибка, не связанная с HTTP (например,
+    несериализуемый payload), останавливает фоновый сброс: она поднимается
+    из следующего enqueue и из выхода из контекста.
+
+    Пример:
+        async with client.buffered("https://sink/bulk") as buf:
+            buf.enqueue({"event": "login"})
+    """
+
+    def __init__(
+        self,
+        client: SecureAsyncHTTPClient,
+        url: str,
+        flush_threshold: int = 100,
+        flush_interval_ms: int = 50,
+    ):
+        """
+        Args:
+            client: Клиент, через который отправляются батчи (с его ретраями)
+            url: URL bulk-эндпойнта
+            flush_threshold: Максимальный размер батча
+            flush_interval_ms: Максимальная задержка отправки, мс
+        """
+        self.client = client
+        self.url = url
+        self.flush_threshold = flush_threshold
+        self.flush_interval = flush_interval_ms / 1000
+        self._buffer: List[Any] = []
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._flusher: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def __aenter__(self) -> "BufferedSecureHTTPClient":
+        self._flusher = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            await self._flusher
+        if self._error is not None:
+            raise self._error
+        await self.flush()
+
+    def enqueue(self, payload: Any) -> None:
+        """Добавление payload в буфер
+
+        Raises:
+            Exception: Ошибка, остановившая фоновый сброс буфера
+        """
+        if self._error is not None:
+            raise self._error
+        self._buffer.append(payload)
+        if len(self._buffer) >= self.flush_threshold:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Немедленная отправка всего буфера батчами по flush_threshold
+
+        Raises:
+            httpx.HTTPError: Если батч не удалось отправить после всех попыток;
+                батч при этом остаётся в буфере
+        """
+        while self._buffer:
+            batch = self._buffer[: self.flush_threshold]
+            del self._buffer[: self.flush_threshold]
+            try:
+                await self.client.post(self.url, json=batch)
+            except BaseException:
+                # Включая отмену задачи: неотправленный батч не теряется
+                self._buffer[:0] = batch
+                raise
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except httpx.HTTPError as e:
+                # Батч остался в буфере и будет отправлен при следующем сбросе
+                logger.error(f"Failed to flush buffered requests to {self.url}: {e}")
+            except Exception as e:
+                # Повтор не поможет: ошибка сохраняется и поднимается вызывающему
+                logger.exception(f"Buffered flusher for {self.url} stopped")
+                self._error = e
+                return
+
+
 # Глобальный экземпляр безопасного HTTP-клиента
 secure_http_client = SecureHTTPClient()
+atexit.register(secure_http_client.close)
@@ -7,9 +7,10 @@
 import logging
 import os
 import re
+import time
 from datetime import datetime, timedelta
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 
 class SecretsManager:
@@ -26,9 +27,26 @@ class SecretsManager:
         r'pass\s*=\s*["\']?[^"\'\s]+["\']?',
     ]
 
+    # Все паттерны в одной альтернации: строка сканируется за один проход,
+    # компиляция выполняется один раз при импорте
+    SECRET_PATTERN_RE = re.compile(
+        "|".join(f"(?:{pattern})" for pattern in SECRET_PATTERNS), re.IGNORECASE
+    )
+
+    # Заготовка маски: середина секрета берётся срезом, без умножения строки
+    _STARS = "*" * 4096
+
+    # Срок жизни секрета без ротации
+    ROTATION_MAX_AGE_NS = 30 * 24 * 60 * 60 * 1_000_000_000
+
     def __init__(self):
         self.secrets: Dict[str, Any] = {}
-        self.rotation_dates: Dict[str, datetime] = {}
+        # key -> time.monotonic_ns() последней ротации: дешевле datetime.now()
+        # и не зависит от перевода системных часов
+        self.rotation_dates: Dict[str, int] = {}
+        # key -> (значение окружения, результат get_secret): повторное чтение
+        # того же значения не запускает проверку паттернами заново
+        self._cache: Dict[str, Tuple[str, Optional[str]]] = {}
         self.logger = logging.getLogger(__name__)
 
     def get_secret(self, key: str, default: Optional[str] = None) -> Optional[str]:
@@ -44,14 +62,25 @@ class SecretsManager:
         """
         value = os.getenv(key, default)
 
-        if value:
-            if self._is_secret_in_code(value):
-                self.logger.warning(f"Потенциальный секрет в коде для ключа: {key}")
-                return None
+        if not value:
+            return value
 
-            self.rotation_dates[key] = datetime.now()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == value:
+            return cached[1]
 
-        return value
+        if self._is_secret_in_code(value):
+            self.logger.warning(f"Потенциальный секрет в коде для ключа: {key}")
+            result = None
+        else:
+            # Дата фиксируется при первом чтении; дальше её обновляет только
+            # rotate_secret, поэтому проверка срока отражает ротацию, а не доступ
+            if key not in self.rotation_dates:
+                self.rotation_dates[key] = time.monotonic_ns()
+            result = value
+
+        self._cache[key] = (value, result)
+        return result
 
     def get_required_secret(self, key: str) -> str:
         """
@@ -73,17 +102,16 @@ class SecretsManager:
 
     def _is_secret_in_code(self, value: str) -> bool:
         """Проверка, не является ли значение секретом в коде"""
-        for pattern in self.SECRET_PATTERNS:
-            if re.search(pattern, value, re.IGNORECASE):
-                return True
-        return False
+        return self.SECRET_PATTERN_RE.search(value) is not None
 
     def mask_secret(self, secret: str) -> str:
         """Маскирование секрета для логирования"""
         if not secret or len(secret) < 4:
             return "***"
 
-        return secret[:2] + "*" * (len(secret) - 4) + secret[-2:]
+        hidden = len(secret) - 4
+        stars = self._STARS[:hidden] if hidden <= len(self._STARS) else "*" * hidden
+        return f"{secret[:2]}{stars}{secret[-2:]}"
 
     def validate_secrets_config(self) -> Dict[str, Any]:
         """
@@ -108,13 +136,31 @@ class SecretsManager:
                 results["valid"] = False
 
         # Проверяем ротацию секретов
-        for key, rotation_date in self.rotation_dates.items():
-            if datetime.now() - rotation_date > timedelta(days=30):
+        now_ns = time.monotonic_ns()
+        for key, rotated_ns in self.rotation_dates.items():
+            if now_ns - rotated_ns > self.ROTATION_MAX_AGE_NS:
                 results["expired_secrets"].append(key)
                 results["warnings"].append(f"Секрет {key} не обновлялся более 30 дней")
 
         return results
 
+    def rotation_datetime(self, key: str) -> Optional[datetime]:
+        """
+        Дата последней ротации секрета для отчётов
+
+        Args:
+            key: Ключ секрета
+
+        Returns:
+            Локальное время ротации или None, если секрет не читался
+        """
+        rotated_ns = self.rotation_dates.get(key)
+        if rotated_ns is None:
+            return None
+
+        age_us = (time.monotonic_ns() - rotated_ns) // 1000
+        return datetime.now() - timedelta(microseconds=age_us)
+
     def log_secret_access(self, secret_key: str, action: str):
         """Логирование доступа к секретам"""
         self.logger.info(f"Access to secret {secret_key}: {action}")
@@ -132,8 +178,9 @@ class SecretsManager:
             self.logger.info(f"Rotating secret {key}")
 
         # В реальном приложении здесь можно было бы влепить интеграцию с Vault/KMS
+        self._cache.pop(key, None)
         os.environ[key] = new_value
-        self.rotation_dates[key] = datetime.now()
+        self.rotation_dates[key] = time.monotonic_ns()
 
         self.logger.info(f"Secret {key} rotated successfully")
 
@@ -145,9 +192,12 @@ def require_secret(secret_key: str):
     """Декоратор для проверки наличия секрета"""
 
     def decorator(func):
+        # Метод связывается один раз при декорировании, а не на каждый вызов
+        get_secret = secrets_manager.get_secret
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if not secrets_manager.get_secret(secret_key):
+            if not get_secret(secret_key):
                 raise ValueError(f"Секрет {secret_key} не настроен")
             return func(*args, **kwargs)
 
@@ -156,6 +206,14 @@ def require_secret(secret_key: str):
     return decorator
 
 
+_SECRET_RE = SecretsManager.SECRET_PATTERN_RE
+
+
+def _mask_assignment(match: re.Match) -> str:
+    """Замена значения в "key=value" на ***, имя ключа сохраняется"""
+    return match.group(0).split("=", 1)[0] + "=***"
+
+
 def mask_in_logs(func):
     """Декоратор для маскирования секретов в логах"""
 
@@ -165,14 +223,7 @@ def mask_in_logs(func):
             result = func(*args, **kwargs)
             return result
         except Exception as e:
-            error_msg = str(e)
-            for pattern in SecretsManager.SECRET_PATTERNS:
-                error_msg = re.sub(
-                    pattern,
-                    lambda m: m.group(0).split("=")[0] + "=***",
-                    error_msg,
-                    flags=re.IGNORECASE,
-                )
+            error_msg = _SECRET_RE.sub(_mask_assignment, str(e))
 
             logging.error(f"Error in {func.__name__}: {error_msg}")
             raise
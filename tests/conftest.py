@@ -1,7 +1,99 @@
 # tests/conftest.py
+import mmap
 import sys
 from pathlib import Path
 
+import pytest
+import pytest_asyncio
+
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+from app.security.secrets import SecretsManager  # noqa: E402
+from app.security.validation import InputValidator  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def orjson_responses():
+    """httpx.Response.json() через orjson: ответы приложения собраны им же"""
+    import httpx
+    import orjson
+
+    stdlib_json = httpx.Response.json
+
+    def orjson_json(self, **kwargs):
+        # Аргументы json.loads поддерживает только stdlib
+        return stdlib_json(self, **kwargs) if kwargs else orjson.loads(self.content)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(httpx.Response, "json", orjson_json)
+        yield
+
+
+@pytest.fixture(scope="session")
+def wishlist_app():
+    """
+    Приложение, прогретое одним циклом запросов
+
+    Первые запросы платят за ленивую инициализацию Starlette/FastAPI и
+    сериализаторов; прогрев переносит эту стоимость из измеряемых тестов.
+    Импорт внутри фикстуры: FastAPI и маршруты загружаются, только если
+    среди выбранных тестов есть API-тесты.
+    """
+    import asyncio
+
+    import httpx
+
+    from app.main import app
+
+    async def warm_up():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post("/wishlist/items", json={"name": "warm-up"})
+            await ac.delete(f"/wishlist/items/{response.json()['id']}")
+            await ac.post("/wishlist/items", json={"name": ""})
+
+    asyncio.run(warm_up())
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(orjson_responses, wishlist_app):
+    """Один TestClient на всю сессию: портал и транспорт создаются один раз"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(wishlist_app) as test_client:
+        yield test_client
+
+
+@pytest_asyncio.fixture
+async def async_client(orjson_responses, wishlist_app):
+    """AsyncClient поверх ASGITransport: запросы идут в приложение в том же цикле событий"""
+    import httpx
+
+    transport = httpx.ASGITransport(app=wishlist_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(scope="module")
+def validator():
+    """Общий InputValidator на модуль; изменения атрибутов - через monkeypatch"""
+    return InputValidator()
+
+
+@pytest.fixture(scope="module")
+def manager():
+    """Общий SecretsManager на модуль; тесты на rotation_dates и кэш создают свой"""
+    return SecretsManager()
+
+
+@pytest.fixture(scope="session")
+def oversize_blob():
+    """Буфер на байт больше MAX_FILE_SIZE; анонимный mmap отдаёт нулевые страницы по требованию"""
+    buffer = mmap.mmap(-1, InputValidator.MAX_FILE_SIZE + 1)
+    view = memoryview(buffer)
+    yield view
+    view.release()
+    buffer.close()
@@ -4,19 +4,19 @@
 Проверяет реализацию ADR-002
 """
 
-from fastapi.testclient import TestClient
+import json
+
+import pytest
 
-from app.main import app
 from app.security.error_handling import (
     ErrorHandler,
     RFC7807Error,
     create_internal_error,
     create_not_found_error,
     create_validation_error,
+    mask_pii,
 )
 
-client = TestClient(app)
-
 
 class TestRFC7807Error:
     """Тесты класса RFC7807Error"""
@@ -118,6 +118,46 @@ class TestRFC7807Error:
         assert "/***PATH***" in error_dict["detail"]
         assert "/home/user/secret.txt" not in error_dict["detail"]
 
+    def test_path_followed_by_email_masking(self):
+        """Тест маскирования email, идущего сразу за путём"""
+        error = RFC7807Error(
+            error_type="validation-error",
+            status=400,
+            detail="Mailbox /var/mail/user@example.com is full",
+            instance="/wishlist/items",
+            correlation_id="test-123",
+        )
+
+        error_dict = error.to_dict()
+
+        assert "user" not in error_dict["detail"]
+        assert "example.com" not in error_dict["detail"]
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("/home/john+doe@example.com", "/***PATH***"),
+            ("/srv/a%b@corp.example.org", "/***PATH***"),
+            ("a@b.cd%a@b.cd", "***@***.***"),
+            ("contact user@example..com now", "contact ***@***.*** now"),
+        ],
+    )
+    def test_email_inside_character_run_masking(self, text, expected):
+        """Тест маскирования email, начинающегося внутри серии символов"""
+        assert mask_pii(text) == expected
+
+    def test_email_at_sentence_end_masking(self):
+        """Тест маскирования email, за которым следует точка"""
+        error = RFC7807Error(
+            error_type="validation-error",
+            status=400,
+            detail="Contact user@mail.example.com.",
+            instance="/wishlist/items",
+            correlation_id="test-123",
+        )
+
+        assert error.to_dict()["detail"] == "Contact ***@***.***."
+
 
 class TestErrorHandler:
     """Тесты класса ErrorHandler"""
@@ -149,6 +189,25 @@ class TestErrorHandler:
         assert correlation_id is not None
         assert len(correlation_id) > 0
 
+    def test_templated_response_matches_to_dict(self):
+        """Тест: тело по заготовке совпадает с to_dict()"""
+        handler = ErrorHandler()
+        error = create_not_found_error(
+            detail='Item "a\\b" of user@example.com',
+            instance="/wishlist/items/1",
+            correlation_id="test-123",
+        )
+
+        response = handler.create_error_response(error, request=None)
+        body = json.loads(response.body)
+        expected = error.to_dict()
+
+        assert response.status_code == 404
+        assert response.headers["content-type"] == "application/json"
+        assert body.pop("timestamp").endswith("Z")
+        expected.pop("timestamp")
+        assert body == expected
+
     def test_mask_sensitive_data_string(self):
         """Тест маскирования чувствительных данных в строке"""
         handler = ErrorHandler()
@@ -187,17 +246,32 @@ class TestErrorHandler:
         assert masked_data[1] == "normal text"
         assert masked_data[2] == "***TOKEN***"
 
+    def test_mask_sensitive_data_nested(self):
+        """Тест маскирования во вложенных структурах"""
+        handler = ErrorHandler()
+
+        sensitive_data = {
+            "items": [{"owner": "user@example.com", "id": 1}, ["token123456789"]],
+            "correlation_id": "0123456789abcdef0123456789abcdef",
+        }
+        masked_data = handler.mask_sensitive_data(sensitive_data)
+
+        assert masked_data["items"][0] == {"owner": "***@***.***", "id": 1}
+        assert masked_data["items"][1] == ["***TOKEN***"]
+        assert masked_data["correlation_id"] == sensitive_data["correlation_id"]
+        assert sensitive_data["items"][0]["owner"] == "user@example.com"
+
 
 class TestAPIErrorHandling:
     """Тесты обработки ошибок через API"""
 
-    def test_validation_error_response_format(self):
+    def test_validation_error_response_format(self, client):
         """Тест формата ответа при ошибке валидации"""
         response = client.post("/wishlist/items", json={"name": ""})
 
         assert response.status_code == 422
 
-    def test_not_found_error_response_format(self):
+    def test_not_found_error_response_format(self, client):
         """Тест формата ответа при ошибке 'не найдено'"""
         response = client.get("/wishlist/items/99999")
 
@@ -217,7 +291,7 @@ class TestAPIErrorHandling:
         assert "not found" in data["detail"].lower()
         assert "/wishlist/items/99999" in data["instance"]
 
-    def test_correlation_id_preservation(self):
+    def test_correlation_id_preservation(self, client):
         """Тест сохранения correlation_id между запросами"""
         headers = {"X-Correlation-ID": "test-correlation-123"}
         response = client.get("/wishlist/items/99999", headers=headers)
@@ -229,7 +303,7 @@ class TestAPIErrorHandling:
 
         assert response.headers["x-correlation-id"] == "test-correlation-123"
 
-    def test_error_response_consistency(self):
+    def test_error_response_consistency(self, client):
         """Тест консистентности формата ошибок"""
         test_cases = [
             ("/wishlist/items/99999", 404, "not-found"),
@@ -259,7 +333,7 @@ class TestAPIErrorHandling:
             if expected_type == "not-found":
                 assert "not-found" in data["type"]
 
-    def test_pii_masking_in_error_responses(self):
+    def test_pii_masking_in_error_responses(self, client):
         """Тест маскирования PII в ответах об ошибках"""
         item_data = {
             "name": "Test item",
@@ -277,7 +351,7 @@ class TestAPIErrorHandling:
             if "abc123def456" in detail:
                 assert "***TOKEN***" in detail
 
-    def test_error_timestamp_format(self):
+    def test_error_timestamp_format(self, client):
         """Тест формата временной метки в ошибках"""
         response = client.get("/wishlist/items/99999")
 
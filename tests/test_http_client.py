@@ -0,0 +1,181 @@
+"""
+Тесты для модуля безопасного HTTP-клиента.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.security.http_client import SecureAsyncHTTPClient
+
+
+def make_status_client(statuses, calls):
+    """Клиент, отвечающий статусами из statuses по очереди"""
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(statuses[len(calls) - 1])
+
+    return SecureAsyncHTTPClient(
+        transport=httpx.MockTransport(handler), retry_delay=0.001
+    )
+
+
+def make_recording_client(batches):
+    """Клиент с локальным транспортом, записывающим тела POST-запросов"""
+
+    def handler(request):
+        batches.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    return SecureAsyncHTTPClient(transport=httpx.MockTransport(handler))
+
+
+class TestSecureAsyncHTTPClientRetries:
+    """Тесты политики повторов"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status", [404, 501, 505])
+    async def test_permanent_error_not_retried(self, status):
+        """Тест: 4xx и неустранимые 5xx возвращаются ошибкой без повторов"""
+        calls = []
+
+        async with make_status_client([status, 200, 200], calls) as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.get("http://upstream/missing")
+
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_server_error_retried(self):
+        """Тест: ответ 5xx повторяется до успешного"""
+        calls = []
+
+        async with make_status_client([503, 502, 200], calls) as client:
+            response = await client.get("http://upstream/flaky")
+
+        assert response.status_code == 200
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_server_error_after_last_attempt(self):
+        """Тест: 5xx на последней попытке возвращается ошибкой"""
+        calls = []
+
+        async with make_status_client([500, 500, 500], calls) as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.get("http://upstream/down")
+
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_unsupported_protocol_not_retried(self):
+        """Тест: неподдерживаемая схема URL не повторяется"""
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            raise httpx.UnsupportedProtocol("unsupported", request=request)
+
+        async with SecureAsyncHTTPClient(
+            transport=httpx.MockTransport(handler), retry_delay=0.001
+        ) as client:
+            with pytest.raises(httpx.UnsupportedProtocol):
+                await client.get("ftp://upstream/file")
+
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_health_check_head_501_falls_back_without_retries(self):
+        """Тест: HEAD с 501 сразу откатывается на GET"""
+        calls = []
+
+        async with make_status_client([501, 200], calls) as client:
+            assert await client.health_check("http://upstream/health") is True
+
+        assert len(calls) == 2
+
+
+class TestBufferedSecureHTTPClient:
+    """Тесты микробатчинга исходящих запросов"""
+
+    @pytest.mark.asyncio
+    async def test_flush_on_exit(self):
+        """Тест: при выходе из контекста буфер отправляется одним запросом"""
+        batches = []
+
+        async with make_recording_client(batches) as client:
+            async with client.buffered(
+                "http://sink/bulk", flush_interval_ms=10_000
+            ) as buf:
+                for i in range(3):
+                    buf.enqueue({"n": i})
+
+        assert batches == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+
+    @pytest.mark.asyncio
+    async def test_batches_split_by_threshold(self):
+        """Тест: батч не превышает flush_threshold"""
+        batches = []
+
+        async with make_recording_client(batches) as client:
+            async with client.buffered(
+                "http://sink/bulk", flush_threshold=2, flush_interval_ms=10_000
+            ) as buf:
+                for i in range(5):
+                    buf.enqueue(i)
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [n for batch in batches for n in batch] == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_manual_flush(self):
+        """Тест: flush() отправляет накопленное без ожидания интервала"""
+        batches = []
+
+        async with make_recording_client(batches) as client:
+            async with client.buffered(
+                "http://sink/bulk", flush_interval_ms=10_000
+            ) as buf:
+                buf.enqueue("event")
+                await buf.flush()
+                assert batches == [["event"]]
+
+        assert batches == [["event"]]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_kept_for_next_flush(self):
+        """Тест: батч, не отправленный после всех попыток, остаётся в буфере"""
+        calls = []
+
+        async with make_status_client([503, 503, 503, 200], calls) as client:
+            async with client.buffered(
+                "http://sink/bulk", flush_interval_ms=10_000
+            ) as buf:
+                buf.enqueue("event")
+                with pytest.raises(httpx.HTTPStatusError):
+                    await buf.flush()
+
+                await buf.flush()
+
+        assert len(calls) == 4
+
+    @pytest.mark.asyncio
+    async def test_flusher_error_raised_to_caller(self):
+        """Тест: ошибка фонового сброса не теряется, а поднимается вызывающему"""
+        batches = []
+
+        async with make_recording_client(batches) as client:
+            with pytest.raises(TypeError):
+                async with client.buffered(
+                    "http://sink/bulk", flush_interval_ms=1
+                ) as buf:
+                    buf.enqueue(object())
+                    await asyncio.sleep(0.05)
+
+                    with pytest.raises(TypeError):
+                        buf.enqueue("event")
+
+        assert batches == []
@@ -4,27 +4,26 @@
 Проверяет защиту от различных атак и некорректных данных.
 """
 
-import tempfile
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from pathlib import Path
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
 
-from app.main import app
-from app.security.http_client import SecureHTTPClient
-from app.security.validation import FileValidationError, InputValidator
+from app.main import WishListItemCreate, validate_create_item
+from app.security.http_client import SecureAsyncHTTPClient, SecureHTTPClient
+from app.security.validation import FileValidationError
 
-client = TestClient(app)
+# Фиксированные моменты вместо datetime.now(): одинаковы во всех прогонах
+DT_WITH_TZ = datetime(2024, 1, 1, 12, 30, tzinfo=timezone(timedelta(hours=3)))
+DT_WITHOUT_TZ = datetime(2024, 1, 1, 12, 30)
 
 
 class TestDecimalValidationNegative:
     """Негативные тесты валидации Decimal"""
 
-    def test_decimal_negative_value(self):
+    def test_decimal_negative_value(self, validator):
         """Тест: отрицательное значение должно быть отклонено"""
-        validator = InputValidator()
-
         with pytest.raises(FileValidationError) as exc_info:
             validator.validate_decimal(
                 -10.5, "price", min_value=Decimal("0"), max_digits=12, decimal_places=2
@@ -32,10 +31,8 @@ class TestDecimalValidationNegative:
 
         assert "не меньше" in str(exc_info.value).lower()
 
-    def test_decimal_too_many_digits(self):
+    def test_decimal_too_many_digits(self, validator):
         """Тест: слишком много цифр должно быть отклонено"""
-        validator = InputValidator()
-
         with pytest.raises(FileValidationError) as exc_info:
             validator.validate_decimal(
                 "1234567890123.45", "price", max_digits=12, decimal_places=2
@@ -43,10 +40,8 @@ class TestDecimalValidationNegative:
 
         assert "слишком много цифр" in str(exc_info.value).lower()
 
-    def test_decimal_too_many_decimal_places(self):
+    def test_decimal_too_many_decimal_places(self, validator):
         """Тест: слишком много знаков после запятой должно быть отклонено"""
-        validator = InputValidator()
-
         with pytest.raises(FileValidationError) as exc_info:
             validator.validate_decimal(
                 "123.456789", "price", max_digits=12, decimal_places=2
@@ -54,19 +49,15 @@ class TestDecimalValidationNegative:
 
         assert "слишком много знаков после запятой" in str(exc_info.value).lower()
 
-    def test_decimal_invalid_format(self):
+    def test_decimal_invalid_format(self, validator):
         """Тест: неверный формат должен быть отклонен"""
-        validator = InputValidator()
-
         with pytest.raises(FileValidationError) as exc_info:
             validator.validate_decimal("not_a_number", "price")
 
         assert "неверный формат" in str(exc_info.value).lower()
 
-    def test_decimal_exceeds_max_value(self):
+    def test_decimal_exceeds_max_value(self, validator):
         """Тест: превышение максимального значения должно быть отклонено"""
-        validator = InputValidator()
-
         with pytest.raises(FileValidationError) as exc_info:
             validator.validate_decimal(
                 "1000000", "price", max_value=Decimal("100000"), max_digits=12
@@ -74,10 +65,8 @@ class TestDecimalValidationNegative:
 
         assert "не больше" in str(exc_info.value).lower()
 
-    def test_decimal_float_precision_issue(self):
+    def test_decimal_float_precision_issue(self, validator):
         """Тест: проверка обработки проблем с точностью float"""
-        validator = InputValidator()
-
         # Float может иметь проблемы с точностью, но после нормализации должно работать
         # Используем значение, которое точно поместится в max_digits
         result = validator.validate_decimal(
@@ -92,121 +81,102 @@ class TestDecimalValidationNegative:
 class TestUTCNormalizationNegative:
     """Негативные тесты нормализации UTC"""
 
-    def test_utc_normalization_with_timezone(self):
+    def test_utc_normalization_with_timezone(self, validator):
         """Тест: нормализация datetime с timezone"""
-        from datetime import datetime, timedelta, timezone
-
-        validator = InputValidator()
-
-        # Создаем datetime с другим timezone
-        dt_with_tz = datetime.now(timezone(timedelta(hours=3)))
-        normalized = validator.normalize_datetime_utc(dt_with_tz)
+        normalized = validator.normalize_datetime_utc(DT_WITH_TZ)
 
         # Должен быть без timezone info
         assert normalized.tzinfo is None
+        assert normalized == datetime(2024, 1, 1, 9, 30)
 
-    def test_utc_normalization_without_timezone(self):
+    def test_utc_normalization_without_timezone(self, validator):
         """Тест: нормализация datetime без timezone"""
-        from datetime import datetime
-
-        validator = InputValidator()
-
-        dt_without_tz = datetime.now()
-        normalized = validator.normalize_datetime_utc(dt_without_tz)
+        normalized = validator.normalize_datetime_utc(DT_WITHOUT_TZ)
 
         # Должен быть без timezone info
         assert normalized.tzinfo is None
+        assert normalized == DT_WITHOUT_TZ
 
 
 class TestSecureFileSaveNegative:
     """Негативные тесты безопасного сохранения файлов"""
 
-    def test_secure_save_too_large_file(self):
-        """Тест: слишком большой файл должен быть отклонен"""
-        validator = InputValidator()
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            validator.upload_dir = Path(temp_dir)
-
-            large_content = b"x" * (validator.MAX_FILE_SIZE + 1)
+    @pytest.fixture
+    def validator(self, validator, tmp_path, monkeypatch):
+        """Общий валидатор со свежим каталогом загрузок на каждый тест"""
+        monkeypatch.setattr(validator, "upload_dir", tmp_path)
+        return validator
 
-            with pytest.raises(FileValidationError) as exc_info:
-                validator.secure_save(large_content)
+    def test_secure_save_too_large_file(self, validator, oversize_blob):
+        """Тест: слишком большой файл должен быть отклонен"""
+        with pytest.raises(FileValidationError) as exc_info:
+            validator.secure_save(oversize_blob)
 
-            assert "слишком большой" in str(exc_info.value).lower()
+        assert "слишком большой" in str(exc_info.value).lower()
 
-    def test_secure_save_invalid_magic_bytes(self):
+    def test_secure_save_invalid_magic_bytes(self, validator):
         """Тест: файл с неверными magic bytes должен быть отклонен"""
-        validator = InputValidator()
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            validator.upload_dir = Path(temp_dir)
+        invalid_content = b"This is not a valid image file"
 
-            invalid_content = b"This is not a valid image file"
-
-            with pytest.raises(FileValidationError) as exc_info:
-                validator.secure_save(invalid_content)
+        with pytest.raises(FileValidationError) as exc_info:
+            validator.secure_save(invalid_content)
 
-            assert "неверный тип файла" in str(exc_info.value).lower()
+        assert "неверный тип файла" in str(exc_info.value).lower()
 
-    def test_secure_save_path_traversal_attempt(self):
+    def test_secure_save_path_traversal_attempt(self, validator):
         """Тест: попытка path traversal должна быть отклонена"""
-        validator = InputValidator()
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            validator.upload_dir = Path(temp_dir)
-
-            # Создаем валидный PNG
-            png_content = (
-                b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00"
-                b"\x01\x08\x02\x00\x00\x00\x90wS\xde"
-            )
+        # Создаем валидный PNG
+        png_content = (
+            b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00"
+            b"\x01\x08\x02\x00\x00\x00\x90wS\xde"
+        )
 
-            # Попытка использовать небезопасный путь через манипуляцию
-            # (в реальности это должно быть проверено в secure_save)
-            try:
-                validator.secure_save(png_content)
-            except FileValidationError:
-                # Ожидаем ошибку, если путь небезопасен
-                pass
+        # Попытка использовать небезопасный путь через манипуляцию
+        # (в реальности это должно быть проверено в secure_save)
+        try:
+            validator.secure_save(png_content)
+        except FileValidationError:
+            # Ожидаем ошибку, если путь небезопасен
+            pass
 
-    def test_secure_save_symlink_detection(self):
+    def test_secure_save_symlink_detection(self, validator):
         """Тест: обнаружение симлинков должно вызывать ошибку"""
-        validator = InputValidator()
+        # Создаем валидный PNG
+        png_content = (
+            b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00"
+            b"\x01\x08\x02\x00\x00\x00\x90wS\xde"
+        )
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            validator.upload_dir = Path(temp_dir)
+        # На Windows симлинки работают по-другому, поэтому просто проверяем,
+        # что метод существует и работает
+        try:
+            result = validator.secure_save(png_content)
+            assert result.exists()
+        except FileValidationError:
+            # Если обнаружен симлинк, это нормально
+            pass
 
-            # Создаем валидный PNG
-            png_content = (
-                b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00"
-                b"\x01\x08\x02\x00\x00\x00\x90wS\xde"
-            )
+    def test_secure_save_malformed_jpeg(self, validator):
+        """Тест: неполный JPEG должен быть отклонен"""
+        # JPEG без EOI маркера и без JFIF/Exif маркеров
+        # Очень короткий JPEG без валидных данных
+        malformed_jpeg = b"\xff\xd8\xff"
 
-            # На Windows симлинки работают по-другому, поэтому просто проверяем,
-            # что метод существует и работает
-            try:
-                result = validator.secure_save(png_content)
-                assert result.exists()
-            except FileValidationError:
-                # Если обнаружен симлинк, это нормально
-                pass
+        with pytest.raises(FileValidationError) as exc_info:
+            validator.secure_save(malformed_jpeg)
 
-    def test_secure_save_malformed_jpeg(self):
-        """Тест: неполный JPEG должен быть отклонен"""
-        validator = InputValidator()
+        assert "неверный тип файла" in str(exc_info.value).lower()
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            validator.upload_dir = Path(temp_dir)
 
-            # JPEG без EOI маркера и без JFIF/Exif маркеров
-            # Очень короткий JPEG без валидных данных
-            malformed_jpeg = b"\xff\xd8\xff"
+def failing_transport(exc_type, calls=None):
+    """Локальный транспорт, мгновенно падающий с exc_type вместо сетевого таймаута"""
 
-            with pytest.raises(FileValidationError) as exc_info:
-                validator.secure_save(malformed_jpeg)
+    def handler(request):
+        if calls is not None:
+            calls.append(request.url.path)
+        raise exc_type("forced", request=request)
 
-            assert "неверный тип файла" in str(exc_info.value).lower()
+    return handler
 
 
 class TestSecureHTTPClientNegative:
@@ -214,86 +184,126 @@ class TestSecureHTTPClientNegative:
 
     def test_http_client_timeout(self):
         """Тест: таймаут должен обрабатываться корректно"""
-        import httpx
-
-        client = SecureHTTPClient(timeout=httpx.Timeout(0.1, connect=0.1))
+        client = SecureHTTPClient(
+            transport=httpx.MockTransport(failing_transport(httpx.ConnectTimeout)),
+            retry_delay=0.001,
+        )
 
-        # Попытка подключиться к несуществующему серверу
         with pytest.raises(httpx.HTTPError):
-            client.get("http://192.0.2.0:9999/nonexistent")
+            client.get("http://upstream/nonexistent")
 
     def test_http_client_max_retries(self):
         """Тест: максимальное количество попыток должно соблюдаться"""
-        import httpx
-
-        client = SecureHTTPClient(max_retries=2, timeout=httpx.Timeout(0.1))
+        calls = []
+        client = SecureHTTPClient(
+            transport=httpx.MockTransport(failing_transport(httpx.ConnectError, calls)),
+            max_retries=2,
+            retry_delay=0.001,
+        )
 
-        # Попытка подключиться к несуществующему серверу
         with pytest.raises(httpx.HTTPError):
-            client.get("http://192.0.2.0:9999/nonexistent")
+            client.get("http://upstream/nonexistent")
 
-    def test_http_client_invalid_url(self):
-        """Тест: неверный URL должен вызывать ошибку"""
-        import httpx
+        assert len(calls) == 2
 
-        client = SecureHTTPClient()
+    def test_http_client_invalid_url(self, monkeypatch):
+        """Тест: неверный URL вызывает ошибку с первой попытки, без задержек"""
+        sleeps = []
+        monkeypatch.setattr(
+            "app.security.http_client.time.sleep", lambda delay: sleeps.append(delay)
+        )
 
-        with pytest.raises(httpx.HTTPError):
-            client.get("not-a-valid-url")
+        with SecureHTTPClient(retry_delay=0.001) as client:
+            with pytest.raises(httpx.UnsupportedProtocol):
+                client.get("not-a-valid-url")
+
+        assert sleeps == []
 
     def test_http_client_health_check_failure(self):
         """Тест: health check должен возвращать False при недоступности"""
-        client = SecureHTTPClient()
+        client = SecureHTTPClient(
+            transport=httpx.MockTransport(failing_transport(httpx.ConnectError)),
+            retry_delay=0.001,
+        )
 
-        result = client.health_check("http://192.0.2.0:9999/health")
+        result = client.health_check("http://upstream/health")
         assert result is False
 
 
+class TestSecureAsyncHTTPClientNegative:
+    """Негативные тесты асинхронного HTTP-клиента"""
+
+    @pytest.mark.asyncio
+    async def test_async_http_client_timeout(self):
+        """Тест: таймаут должен обрабатываться корректно"""
+        async with SecureAsyncHTTPClient(
+            transport=httpx.MockTransport(failing_transport(httpx.ConnectTimeout)),
+            max_retries=2,
+            retry_delay=0.001,
+        ) as client:
+            with pytest.raises(httpx.HTTPError):
+                await client.get("http://upstream/nonexistent")
+
+    @pytest.mark.asyncio
+    async def test_async_http_client_invalid_url(self):
+        """Тест: неверный URL должен вызывать ошибку"""
+        async with SecureAsyncHTTPClient(retry_delay=0.001) as client:
+            with pytest.raises(httpx.UnsupportedProtocol):
+                await client.get("not-a-valid-url")
+
+    @pytest.mark.asyncio
+    async def test_async_http_client_health_check_failure(self):
+        """Тест: health check должен возвращать False при недоступности"""
+        async with SecureAsyncHTTPClient(
+            transport=httpx.MockTransport(failing_transport(httpx.ConnectError)),
+            max_concurrency=1,
+            retry_delay=0.001,
+        ) as client:
+            assert await client.health_check("http://upstream/health") is False
+
+
 class TestAPIDecimalValidationNegative:
     """Негативные тесты валидации Decimal через API"""
 
-    def test_create_item_with_negative_price(self):
+    def test_create_item_with_negative_price(self, client):
         """Тест: создание элемента с отрицательной ценой должно быть отклонено"""
         response = client.post("/wishlist/items", json={"name": "Test", "price": -10.5})
 
         # FastAPI валидация должна отклонить отрицательное значение
         assert response.status_code == 422
 
-    def test_create_item_with_too_precise_price(self):
+    def test_create_item_with_too_precise_price(self, client):
         """Тест: создание элемента с слишком точной ценой"""
         # Попытка создать элемент с ценой, имеющей много знаков после запятой
         response = client.post(
             "/wishlist/items", json={"name": "Test", "price": 123.4567890123}
         )
 
-        # Валидация должна обработать это (округление до 2 знаков) или отклонить
-        assert response.status_code in [200, 400, 422]
+        # 13 значащих цифр при лимите max_digits=12
+        assert response.status_code == 400
+        assert "слишком много цифр" in response.json()["detail"]
 
-    def test_create_item_with_very_large_price(self):
+    def test_create_item_with_very_large_price(self, client):
         """Тест: создание элемента с очень большой ценой"""
         response = client.post("/wishlist/items", json={"name": "Test", "price": 1e15})
 
-        # Валидация должна обработать или отклонить
-        assert response.status_code in [200, 400, 422]
+        # 16 цифр в целой части при max_digits=12
+        assert response.status_code == 400
+        assert "слишком много цифр" in response.json()["detail"]
 
 
 class TestAPIFileUploadNegative:
     """Негативные тесты загрузки файлов через API"""
 
-    def test_upload_file_too_large(self):
+    def test_upload_file_too_large(self, validator, oversize_blob):
         """Тест: загрузка слишком большого файла должна быть отклонена"""
-        validator = InputValidator()
-        large_content = b"x" * (validator.MAX_FILE_SIZE + 1)
-
         with pytest.raises(FileValidationError) as exc_info:
-            validator.validate_file_upload(large_content, "large.jpg", "image/jpeg")
+            validator.validate_file_upload(oversize_blob, "large.jpg", "image/jpeg")
 
         assert "слишком большой" in str(exc_info.value).lower()
 
-    def test_upload_file_wrong_magic_bytes(self):
+    def test_upload_file_wrong_magic_bytes(self, validator):
         """Тест: загрузка файла с неверными magic bytes должна быть отклонена"""
-        validator = InputValidator()
-
         fake_image = b"This is not an image file"
 
         with pytest.raises(FileValidationError) as exc_info:
@@ -301,10 +311,8 @@ class TestAPIFileUploadNegative:
 
         assert "неверный тип файла" in str(exc_info.value).lower()
 
-    def test_upload_file_mismatched_content_type(self):
+    def test_upload_file_mismatched_content_type(self, validator):
         """Тест: несоответствие content-type и magic bytes должно быть отклонено"""
-        validator = InputValidator()
-
         # PNG файл, но указан JPEG content-type
         png_content = (
             b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00"
@@ -320,10 +328,8 @@ class TestAPIFileUploadNegative:
 class TestInputValidationBoundaryCases:
     """Тесты граничных случаев валидации ввода"""
 
-    def test_string_input_max_length_boundary(self):
+    def test_string_input_max_length_boundary(self, validator):
         """Тест: граничное значение максимальной длины"""
-        validator = InputValidator()
-
         # Ровно максимальная длина
         max_length_string = "x" * 1000
         result = validator.validate_string_input(
@@ -337,26 +343,20 @@ class TestInputValidationBoundaryCases:
                 max_length_string + "x", "test_field", max_length=1000
             )
 
-    def test_string_input_empty_after_strip(self):
+    def test_string_input_empty_after_strip(self, validator):
         """Тест: пустая строка после strip должна быть разрешена"""
-        validator = InputValidator()
-
         result = validator.validate_string_input("   ", "test_field")
         assert result == ""
 
-    def test_decimal_zero_value(self):
+    def test_decimal_zero_value(self, validator):
         """Тест: нулевое значение должно быть разрешено"""
-        validator = InputValidator()
-
         result = validator.validate_decimal(
             "0", "price", min_value=Decimal("0"), max_digits=12, decimal_places=2
         )
         assert result == Decimal("0")
 
-    def test_decimal_min_value_boundary(self):
+    def test_decimal_min_value_boundary(self, validator):
         """Тест: граничное значение минимальной цены"""
-        validator = InputValidator()
-
         # Ровно минимальное значение
         result = validator.validate_decimal(
             "0", "price", min_value=Decimal("0"), max_digits=12, decimal_places=2
@@ -377,23 +377,30 @@ class TestInputValidationBoundaryCases:
 class TestSQLInjectionPrevention:
     """Тесты защиты от SQL-инъекций (даже если БД нет)"""
 
-    def test_sql_injection_in_name_field(self):
-        """Тест: SQL-инъекция в поле name должна быть отклонена"""
-        sql_payloads = [
+    @pytest.mark.parametrize(
+        "payload",
+        [
             "'; DROP TABLE users; --",
             "1' OR '1'='1",
             "admin'--",
             "'; INSERT INTO users VALUES ('hacker', 'pass'); --",
             "union select * from users",
-        ]
+        ],
+    )
+    def test_sql_injection_in_name_field(self, payload):
+        """Тест: SQL-инъекция в поле name должна быть отклонена"""
+        with pytest.raises(FileValidationError):
+            validate_create_item(WishListItemCreate(name=payload))
 
-        for payload in sql_payloads:
-            response = client.post("/wishlist/items", json={"name": payload})
+    def test_sql_injection_in_name_field_api(self, client):
+        """Тест: SQL-инъекция в поле name отклоняется через API"""
+        response = client.post("/wishlist/items", json={"name": "admin'--"})
 
-            # Должно быть отклонено валидацией
-            assert response.status_code in [400, 422]
+        # Отклоняется InputValidator: ошибка RFC 7807 со статусом 400
+        assert response.status_code == 400
+        assert response.json()["type"].endswith("/validation-error")
 
-    def test_sql_injection_in_description_field(self):
+    def test_sql_injection_in_description_field(self, client):
         """Тест: SQL-инъекция в поле description должна быть отклонена"""
         sql_payload = "'; DROP TABLE wishlist_items; --"
 
@@ -402,45 +409,42 @@ class TestSQLInjectionPrevention:
             json={"name": "Test", "description": sql_payload},
         )
 
-        # Должно быть отклонено валидацией
-        assert response.status_code in [400, 422]
+        # Отклоняется InputValidator: ошибка RFC 7807 со статусом 400
+        assert response.status_code == 400
 
 
 class TestXSSPrevention:
     """Тесты защиты от XSS"""
 
-    def test_xss_in_name_field(self):
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            "<script>alert('XSS')</script>",
+            "javascript:alert('XSS')",
+            "data:text/html,<script>alert('XSS')</script>",
+        ],
+    )
+    def test_xss_in_name_field(self, payload):
         """Тест: XSS в поле name должен быть отклонен"""
-        from app.security.validation import input_validator
-
-        xss_payloads = [
-            ("<script>alert('XSS')</script>", True),  # Должен быть заблокирован
-            ("javascript:alert('XSS')", True),  # Должен быть заблокирован
-            ("<img src=x onerror=alert('XSS')>", False),  # Может не блокироваться
-            (
-                "data:text/html,<script>alert('XSS')</script>",
-                True,
-            ),  # Должен быть заблокирован
-        ]
-
-        for payload, should_block in xss_payloads:
-            if should_block:
-                # Проверяем, что валидатор блокирует
-                with pytest.raises(FileValidationError):
-                    input_validator.validate_string_input(payload, "name")
-
-                # Проверяем через API
-                response = client.post("/wishlist/items", json={"name": payload})
-                assert response.status_code in [400, 422]
-            else:
-                # Для паттернов, которые могут не блокироваться, просто проверяем, что не падает
-                try:
-                    input_validator.validate_string_input(payload, "name")
-                except FileValidationError:
-                    # Если блокируется, это тоже нормально
-                    pass
-
-    def test_xss_in_description_field(self):
+        with pytest.raises(FileValidationError):
+            validate_create_item(WishListItemCreate(name=payload))
+
+    def test_xss_in_name_field_api(self, client):
+        """Тест: XSS в поле name отклоняется через API"""
+        response = client.post(
+            "/wishlist/items", json={"name": "<script>alert('XSS')</script>"}
+        )
+        assert response.status_code == 400
+
+    def test_xss_event_handler_in_name_field(self, validator):
+        """Тест: паттерн, который может не блокироваться, не роняет валидатор"""
+        try:
+            validator.validate_string_input("<img src=x onerror=alert('XSS')>", "name")
+        except FileValidationError:
+            # Если блокируется, это тоже нормально
+            pass
+
+    def test_xss_in_description_field(self, client):
         """Тест: XSS в поле description должен быть отклонен"""
         xss_payload = "<script>alert('XSS')</script>"
 
@@ -449,29 +453,28 @@ class TestXSSPrevention:
             json={"name": "Test", "description": xss_payload},
         )
 
-        # Должно быть отклонено валидацией
-        assert response.status_code in [400, 422]
+        # Отклоняется InputValidator: ошибка RFC 7807 со статусом 400
+        assert response.status_code == 400
 
 
 class TestPathTraversalPrevention:
     """Тесты защиты от path traversal"""
 
-    def test_path_traversal_in_filename(self):
-        """Тест: path traversal в имени файла должен быть отклонен"""
-        validator = InputValidator()
-
-        traversal_payloads = [
+    @pytest.mark.parametrize(
+        "payload",
+        [
             "../../../etc/passwd",
             "..\\..\\windows\\system32",
             "..%2f..%2f..%2fetc%2fpasswd",
             "..%5c..%5c..%5cwindows%5csystem32",
-        ]
-
-        for payload in traversal_payloads:
-            with pytest.raises(FileValidationError):
-                validator.validate_string_input(payload, "filename")
+        ],
+    )
+    def test_path_traversal_in_filename(self, validator, payload):
+        """Тест: path traversal в имени файла должен быть отклонен"""
+        with pytest.raises(FileValidationError):
+            validator.validate_string_input(payload, "filename")
 
-    def test_path_traversal_attempt_in_api(self):
+    def test_path_traversal_attempt_in_api(self, client):
         """Тест: попытка path traversal через API должна быть отклонена"""
         traversal_payload = "../../../etc/passwd"
 
@@ -480,5 +483,5 @@ class TestPathTraversalPrevention:
             json={"name": "Test", "description": traversal_payload},
         )
 
-        # Должно быть отклонено валидацией
-        assert response.status_code in [400, 422]
+        # Отклоняется InputValidator: ошибка RFC 7807 со статусом 400
+        assert response.status_code == 400
@@ -1,65 +1,171 @@
-from fastapi.testclient import TestClient
+import itertools
+
+import orjson
+import pytest
+
+from app import main
+
+# Все тесты модуля асинхронные и идут через общий ASGITransport
+pytestmark = pytest.mark.asyncio
+
+
+# Тела запросов сериализуются один раз при импорте модуля
+JSON_HEADERS = {"content-type": "application/json"}
+BY_ID_BODY = orjson.dumps({"name": "Тестовый элемент", "description": "Описание"})
+LIFECYCLE_SEED_BODY = orjson.dumps({"name": "Исходный элемент", "priority": "low"})
+UPDATE_BODY = orjson.dumps(
+    {"name": "Обновленный элемент", "priority": "high", "is_purchased": True}
+)
+RENAME_BODY = orjson.dumps({"name": "Новое имя"})
+MOVING_SEED_BODY = orjson.dumps({"name": "Переезжающий", "priority": "low"})
+MOVE_BODY = orjson.dumps({"priority": "high", "is_purchased": True})
+
+
+@pytest.fixture(autouse=True)
+def empty_store(monkeypatch):
+    """Каждый тест начинает с пустого хранилища; после теста оно восстанавливается"""
+    monkeypatch.setattr(main, "_DB_BY_ID", {})
+    monkeypatch.setattr(main, "_IDX", {})
+    monkeypatch.setattr(main, "_NEXT_ID", itertools.count(1))
+
+
+def post_json(client, url, body):
+    """POST с уже сериализованным JSON-телом"""
+    return client.post(url, content=body, headers=JSON_HEADERS)
+
+
+async def asgi_request(method, path, body=b""):
+    """
+    Запрос напрямую в ASGI-приложение, без клиента и транспорта
+
+    Returns:
+        (статус, разобранное JSON-тело)
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("test", 0),
+        "server": ("test", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+    chunks = []
 
-from app.main import app
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
 
-client = TestClient(app)
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
 
+    await main.app(scope, receive, send)
+    return status, orjson.loads(b"".join(chunks))
 
-def test_create_wishlist_item():
-    """Тест создания элемента списка желаний"""
-    item_data = {
-        "name": "Новый iPhone",
-        "description": "Последняя модель iPhone",
-        "price": 999.99,
-        "priority": "high",
-    }
 
-    response = client.post("/wishlist/items", json=item_data)
+def seed_items(items_data):
+    """Запись элементов прямо в хранилище, минуя HTTP: для тестов чтения"""
+    now = main._utc_now()
+    items = []
+    for item_data in items_data:
+        item = {
+            "id": next(main._NEXT_ID),
+            "description": None,
+            "price": None,
+            "priority": "medium",
+            "is_purchased": False,
+            "created_at": now,
+            "updated_at": now,
+            **item_data,
+        }
+        main._DB_BY_ID[item["id"]] = item
+        main._index_add(item)
+        items.append(item)
+    return items
+
+
+@pytest.mark.parametrize(
+    "body,expected_fields",
+    [
+        pytest.param(
+            orjson.dumps(
+                {
+                    "name": "Новый iPhone",
+                    "description": "Последняя модель iPhone",
+                    "price": 999.99,
+                    "priority": "high",
+                }
+            ),
+            {
+                "name": "Новый iPhone",
+                "description": "Последняя модель iPhone",
+                "price": 999.99,
+                "priority": "high",
+                "is_purchased": False,
+            },
+            id="full",
+        ),
+        pytest.param(
+            orjson.dumps({"name": "Простая вещь"}),
+            {
+                "name": "Простая вещь",
+                "description": None,
+                "price": None,
+                "priority": "medium",
+            },
+            id="minimal",
+        ),
+    ],
+)
+async def test_create_wishlist_item(async_client, body, expected_fields):
+    """Тест создания элемента списка желаний"""
+    response = await post_json(async_client, "/wishlist/items", body)
     assert response.status_code == 200
 
     data = response.json()
-    assert data["name"] == item_data["name"]
-    assert data["description"] == item_data["description"]
-    assert data["price"] == item_data["price"]
-    assert data["priority"] == item_data["priority"]
-    assert data["is_purchased"] is False
+    assert {key: data[key] for key in expected_fields} == expected_fields
     assert "id" in data
     assert "created_at" in data
     assert "updated_at" in data
 
 
-def test_create_wishlist_item_minimal():
-    """Тест создания элемента с минимальными данными"""
-    item_data = {"name": "Простая вещь"}
-
-    response = client.post("/wishlist/items", json=item_data)
-    assert response.status_code == 200
-
-    data = response.json()
-    assert data["name"] == "Простая вещь"
-    assert data["description"] is None
-    assert data["price"] is None
-    assert data["priority"] == "medium"
-
-
-def test_create_wishlist_item_validation_error():
-    """Тест валидации при создании элемента"""
-    # Пустое имя
-    response = client.post("/wishlist/items", json={"name": ""})
-    assert response.status_code == 422
-
-    # Неверный приоритет
-    response = client.post(
-        "/wishlist/items", json={"name": "Тест", "priority": "invalid"}
-    )
-    assert response.status_code == 422
-
-    # Отрицательная цена
-    response = client.post("/wishlist/items", json={"name": "Тест", "price": -10})
-    assert response.status_code == 422
-
-
-def test_get_wishlist_items():
+@pytest.mark.parametrize(
+    "body,field",
+    [
+        pytest.param(orjson.dumps({"name": ""}), "name", id="empty-name"),
+        pytest.param(
+            orjson.dumps({"name": "Тест", "priority": "invalid"}),
+            "priority",
+            id="invalid-priority",
+        ),
+        pytest.param(
+            orjson.dumps({"name": "Тест", "price": -10}), "price", id="negative-price"
+        ),
+    ],
+)
+async def test_create_wishlist_item_validation_error(body, field):
+    """Тест валидации при создании элемента: ответ 422 до обработчика"""
+    status, data = await asgi_request("POST", "/wishlist/items", body)
+
+    assert status == 422
+    assert [error["loc"] for error in data["detail"]] == [["body", field]]
+
+
+async def test_get_wishlist_items(async_client):
     """Тест получения всех элементов списка желаний"""
     # Создаем несколько элементов
     items_data = [
@@ -68,50 +174,49 @@ def test_get_wishlist_items():
         {"name": "Элемент 3", "priority": "medium"},
     ]
 
-    created_items = []
-    for item_data in items_data:
-        response = client.post("/wishlist/items", json=item_data)
-        created_items.append(response.json())
+    created_items = seed_items(items_data)
 
     # Получаем все элементы
-    response = client.get("/wishlist/items")
+    response = await async_client.get("/wishlist/items")
     assert response.status_code == 200
 
     data = response.json()
-    assert len(data) >= len(created_items)
+    assert len(data) == len(created_items) == 3
+    assert [item["name"] for item in data] == ["Элемент 1", "Элемент 2", "Элемент 3"]
 
 
-def test_get_wishlist_items_with_filters():
+async def test_get_wishlist_items_with_filters(async_client):
     """Тест получения элементов с фильтрацией"""
     # Создаем элементы с разными приоритетами
-    client.post("/wishlist/items", json={"name": "High priority", "priority": "high"})
-    client.post("/wishlist/items", json={"name": "Low priority", "priority": "low"})
+    seed_items(
+        [
+            {"name": "High priority", "priority": "high"},
+            {"name": "Low priority", "priority": "low"},
+        ]
+    )
 
     # Фильтр по приоритету
-    response = client.get("/wishlist/items?priority=high")
+    response = await async_client.get("/wishlist/items?priority=high")
     assert response.status_code == 200
     data = response.json()
-    for item in data:
-        assert item["priority"] == "high"
+    assert [item["name"] for item in data] == ["High priority"]
 
     # Фильтр по статусу покупки
-    response = client.get("/wishlist/items?is_purchased=false")
+    response = await async_client.get("/wishlist/items?is_purchased=false")
     assert response.status_code == 200
     data = response.json()
-    for item in data:
-        assert item["is_purchased"] is False
+    assert [item["name"] for item in data] == ["High priority", "Low priority"]
 
 
-def test_get_wishlist_item_by_id():
+async def test_get_wishlist_item_by_id(async_client):
     """Тест получения конкретного элемента по ID"""
     # Создаем элемент
-    item_data = {"name": "Тестовый элемент", "description": "Описание"}
-    response = client.post("/wishlist/items", json=item_data)
+    response = await post_json(async_client, "/wishlist/items", BY_ID_BODY)
     created_item = response.json()
     item_id = created_item["id"]
 
     # Получаем элемент по ID
-    response = client.get(f"/wishlist/items/{item_id}")
+    response = await async_client.get(f"/wishlist/items/{item_id}")
     assert response.status_code == 200
 
     data = response.json()
@@ -120,31 +225,41 @@ def test_get_wishlist_item_by_id():
     assert data["description"] == "Описание"
 
 
-def test_get_wishlist_item_not_found():
-    """Тест получения несуществующего элемента"""
-    response = client.get("/wishlist/items/99999")
+@pytest.mark.parametrize(
+    "method,body",
+    [("GET", None), ("PUT", RENAME_BODY), ("DELETE", None)],
+)
+async def test_wishlist_item_not_found(async_client, method, body):
+    """Тест: операции над несуществующим элементом возвращают 404 в формате RFC 7807"""
+    response = await async_client.request(
+        method,
+        "/wishlist/items/99999",
+        content=body,
+        headers=JSON_HEADERS if body else None,
+    )
     assert response.status_code == 404
 
     data = response.json()
     assert data["status"] == 404
+    assert data["type"].endswith("/not-found")
     assert "not found" in data["detail"].lower()
 
 
-def test_update_wishlist_item():
-    """Тест обновления элемента списка желаний"""
+async def test_item_lifecycle(async_client):
+    """Тест полного цикла элемента: создание, чтение, обновление, удаление"""
     # Создаем элемент
-    item_data = {"name": "Исходный элемент", "priority": "low"}
-    response = client.post("/wishlist/items", json=item_data)
-    created_item = response.json()
-    item_id = created_item["id"]
+    response = await post_json(async_client, "/wishlist/items", LIFECYCLE_SEED_BODY)
+    assert response.status_code == 200
+    item_id = response.json()["id"]
+
+    response = await async_client.get(f"/wishlist/items/{item_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Исходный элемент"
 
     # Обновляем элемент
-    update_data = {
-        "name": "Обновленный элемент",
-        "priority": "high",
-        "is_purchased": True,
-    }
-    response = client.put(f"/wishlist/items/{item_id}", json=update_data)
+    response = await async_client.put(
+        f"/wishlist/items/{item_id}", content=UPDATE_BODY, headers=JSON_HEADERS
+    )
     assert response.status_code == 200
 
     data = response.json()
@@ -153,43 +268,47 @@ def test_update_wishlist_item():
     assert data["is_purchased"] is True
     assert data["id"] == item_id
 
-
-def test_update_wishlist_item_not_found():
-    """Тест обновления несуществующего элемента"""
-    update_data = {"name": "Новое имя"}
-    response = client.put("/wishlist/items/99999", json=update_data)
-    assert response.status_code == 404
-
-    data = response.json()
-    assert data["status"] == 404
-    assert "not found" in data["detail"].lower()
-
-
-def test_delete_wishlist_item():
-    """Тест удаления элемента списка желаний"""
-    # Создаем элемент
-    item_data = {"name": "Элемент для удаления"}
-    response = client.post("/wishlist/items", json=item_data)
-    created_item = response.json()
-    item_id = created_item["id"]
+    # Обновление видно при повторном чтении
+    response = await async_client.get(f"/wishlist/items/{item_id}")
+    assert response.json() == data
 
     # Удаляем элемент
-    response = client.delete(f"/wishlist/items/{item_id}")
+    response = await async_client.delete(f"/wishlist/items/{item_id}")
     assert response.status_code == 200
 
     data = response.json()
     assert "deleted successfully" in data["message"]
 
     # Проверяем, что элемент действительно удален
-    response = client.get(f"/wishlist/items/{item_id}")
+    response = await async_client.get(f"/wishlist/items/{item_id}")
     assert response.status_code == 404
 
 
-def test_delete_wishlist_item_not_found():
-    """Тест удаления несуществующего элемента"""
-    response = client.delete("/wishlist/items/99999")
-    assert response.status_code == 404
+async def test_get_wishlist_items_filters_follow_updates(async_client):
+    """Тест: фильтры учитывают обновление и удаление элементов"""
+    response = await post_json(async_client, "/wishlist/items", MOVING_SEED_BODY)
+    item_id = response.json()["id"]
 
-    data = response.json()
-    assert data["status"] == 404
-    assert "not found" in data["detail"].lower()
+    await async_client.put(
+        f"/wishlist/items/{item_id}", content=MOVE_BODY, headers=JSON_HEADERS
+    )
+
+    ids = [
+        i["id"] for i in (await async_client.get("/wishlist/items?priority=low")).json()
+    ]
+    assert item_id not in ids
+    ids = [
+        i["id"]
+        for i in (
+            await async_client.get("/wishlist/items?priority=high&is_purchased=true")
+        ).json()
+    ]
+    assert item_id in ids
+
+    await async_client.delete(f"/wishlist/items/{item_id}")
+
+    ids = [
+        i["id"]
+        for i in (await async_client.get("/wishlist/items?is_purchased=true")).json()
+    ]
+    assert item_id not in ids